@@ -1,29 +1,76 @@
+import csv
+import io
 import streamlit as st
 import numpy as np
 import pandas as pd
-import altair as alt
-
-# Glide path function with multiple strategies
-def get_equity_allocation(age, strategy, start_age=27, end_age=60, start_pct=0.85, end_pct=0.2):
-    if strategy == "Aggressive":
-        start_pct, end_pct = 0.9, 0.3
-    elif strategy == "Balanced":
-        start_pct, end_pct = 0.85, 0.2
-    elif strategy == "Conservative":
-        start_pct, end_pct = 0.7, 0.2
-
-    if age <= start_age:
-        return start_pct
-    elif age >= end_age:
-        return end_pct
-    else:
-        return start_pct - ((age - start_age) / (end_age - start_age)) * (start_pct - end_pct)
-
-def calculate_annual_emi(principal, annual_rate, years):
-    monthly_rate = annual_rate / 12
-    months = years * 12
-    emi = (principal * monthly_rate * (1 + monthly_rate)**months) / ((1 + monthly_rate)**months - 1)
-    return emi * 12
+
+# Kernels live in their own module so numba's compiled dispatchers are
+# created once per process instead of on every Streamlit rerun
+from sim_kernels import equity_alloc_vec, cashflows, simulate
+
+# Simulation amounts are in ₹, reported in crores (1 Cr = 1e7)
+PER_CRORE = 1e-7
+
+# Static Vega-Lite chart specs; the result DataFrame is sent alongside as Arrow
+LINE_SPEC = {
+    "mark": "line",
+    "height": 300,
+    "encoding": {
+        "x": {"field": "Age", "type": "quantitative"},
+        "y": {"field": "Net Worth", "type": "quantitative", "title": "Net Worth (Cr)"},
+        "tooltip": [
+            {"field": "Age", "type": "quantitative"},
+            {"field": "Net Worth", "type": "quantitative"}
+        ]
+    }
+}
+AREA_SPEC = {
+    "transform": [{"fold": ["Contribution", "Return", "Expense"], "as": ["Type", "Amount"]}],
+    "mark": {"type": "area", "opacity": 0.6},
+    "height": 300,
+    "encoding": {
+        "x": {"field": "Age", "type": "quantitative", "title": "Age"},
+        "y": {"field": "Amount", "type": "quantitative", "title": "Amount (Cr)"},
+        "color": {"field": "Type", "type": "nominal", "title": "Flow Type"},
+        "tooltip": [
+            {"field": "Age", "type": "quantitative"},
+            {"field": "Type", "type": "nominal"},
+            {"field": "Amount", "type": "quantitative", "format": ".2f"}
+        ]
+    }
+}
+
+# Glide path strategies as (start_pct, end_pct); "Custom" uses the user's values
+STRATEGIES = {
+    "Aggressive": (0.9, 0.3),
+    "Balanced": (0.85, 0.2),
+    "Conservative": (0.7, 0.2),
+}
+
+def glide_path_bounds(strategy, start_pct=0.85, end_pct=0.2):
+    return STRATEGIES.get(strategy, (start_pct, end_pct))
+
+def _yearly_flows(current_age, retirement_age, life_expectancy,
+                  monthly_contribution, annual_ret_expenses, exp_inflation_rate,
+                  annual_contrib_increase, one_time_expenses,
+                  home_loan, strategy, custom_start, custom_end, custom_age):
+    years = life_expectancy - current_age + 1
+    ages = np.arange(current_age, current_age + years, dtype=np.int16)
+
+    start_pct, end_pct = glide_path_bounds(strategy, custom_start, custom_end)
+    exp_ages = np.array([exp_age for exp_age, _ in one_time_expenses], dtype=np.int64)
+    exp_amounts = np.array([amount for _, amount in one_time_expenses], dtype=np.float32)
+
+    emi_start_age, emi_principal, emi_years, emi_rate = home_loan if home_loan else (0, 0.0, 0, 0.0)
+
+    equity_alloc, contribs, outflows = cashflows(
+        ages, current_age, retirement_age,
+        np.float32(monthly_contribution), np.float32(annual_ret_expenses), np.float32(exp_inflation_rate),
+        np.float32(annual_contrib_increase), np.float32(start_pct), np.float32(end_pct), custom_age,
+        exp_ages, exp_amounts,
+        int(emi_start_age), np.float32(emi_principal), int(emi_years), np.float32(emi_rate)
+    )
+    return ages, equity_alloc, contribs, outflows
 
 def retirement_calculator(current_age, retirement_age, life_expectancy,
                           current_savings, monthly_contribution,
@@ -32,63 +79,82 @@ def retirement_calculator(current_age, retirement_age, life_expectancy,
                           annual_contrib_increase, one_time_expenses,
                           home_loan=None, strategy="Balanced",
                           custom_start=0.85, custom_end=0.2, custom_age=60):
-    years = life_expectancy - current_age + 1
-    ages = np.arange(current_age, current_age + years)
-
-    data = []
-    balance = current_savings
-    contrib = monthly_contribution * 12
-    emi_amount = -1
-
-    for i, age in enumerate(ages):
-        equity_allocation = get_equity_allocation(age, strategy, start_age=current_age, end_age=custom_age, start_pct=custom_start, end_pct=custom_end)
-        fixed_allocation = 1 - equity_allocation
-        annual_return = equity_allocation * equity_return + fixed_allocation * fixed_income_return
-
-        growth = balance * annual_return
-        balance += growth
-
-        # Contributions
-        contribution = 0
-        if age < retirement_age:
-            contribution = contrib
-            balance += contribution
-            contrib *= (1 + annual_contrib_increase)
-
-        # Retirement expenses
-        expense = 0
-        if age >= retirement_age:
-            years_since_ret = age - current_age
-            expense = annual_ret_expenses * ((1 + exp_inflation_rate) ** years_since_ret)
-            balance -= expense
-
-        # One-time expenses
-        for exp_age, amount in one_time_expenses:
-            if age == exp_age:
-                inflated_amount = amount * ((1 + exp_inflation_rate) ** (age - current_age))
-                balance -= inflated_amount
-                expense += inflated_amount
-
-        # Home loan EMI
-        if home_loan:
-            emi_start_age, emi_principal, emi_years, emi_rate = home_loan
-            if age == emi_start_age and emi_amount < 0:
-                effective_principal = emi_principal * ((1 + exp_inflation_rate) ** (age - current_age))
-                emi_amount = calculate_annual_emi(effective_principal, emi_rate, emi_years)
-            if emi_start_age <= age < emi_start_age + emi_years and emi_amount > 0:
-                balance -= emi_amount
-                expense += emi_amount
-
-        data.append({
-            "Age": age,
-            "Net Worth": balance / 1e7,
-            "Contribution": contribution / 1e7,
-            "Expense": expense / 1e7,
-            "Return": growth / 1e7,
-            "Equity %": equity_allocation * 100
-        })
-
-    return pd.DataFrame(data)
+    ages, equity_alloc, contribs, outflows = _yearly_flows(
+        current_age, retirement_age, life_expectancy,
+        monthly_contribution, annual_ret_expenses, exp_inflation_rate,
+        annual_contrib_increase, one_time_expenses,
+        home_loan, strategy, custom_start, custom_end, custom_age
+    )
+    balance, growth = simulate(
+        equity_alloc, contribs, outflows,
+        np.float32(current_savings), np.float32(equity_return), np.float32(fixed_income_return)
+    )
+
+    # Build the frame column-at-a-time from the arrays; copy=False keeps
+    # pandas from duplicating each column while consolidating blocks
+    return pd.DataFrame({
+        "Age": ages,
+        "Net Worth": balance * PER_CRORE,
+        "Contribution": contribs * PER_CRORE,
+        "Expense": outflows * PER_CRORE,
+        "Return": growth * PER_CRORE,
+        "Equity %": equity_alloc * 100.0
+    }, copy=False)
+
+def monte_carlo_simulation(current_age, retirement_age, life_expectancy,
+                           current_savings, monthly_contribution,
+                           equity_return, fixed_income_return,
+                           annual_ret_expenses, exp_inflation_rate,
+                           annual_contrib_increase, one_time_expenses,
+                           home_loan=None, strategy="Balanced",
+                           custom_start=0.85, custom_end=0.2, custom_age=60,
+                           n_scenarios=1000, equity_vol=0.18, fixed_income_vol=0.04, seed=0):
+    ages, equity_alloc, contribs, outflows = _yearly_flows(
+        current_age, retirement_age, life_expectancy,
+        monthly_contribution, annual_ret_expenses, exp_inflation_rate,
+        annual_contrib_increase, one_time_expenses,
+        home_loan, strategy, custom_start, custom_end, custom_age
+    )
+
+    # Yearly returns drawn independently per scenario, as (scenarios, years) grids
+    rng = np.random.default_rng(seed)
+    shape = (n_scenarios, ages.shape[0])
+    eq_rets = np.float32(equity_return) + np.float32(equity_vol) * rng.standard_normal(shape, dtype=np.float32)
+    fi_rets = np.float32(fixed_income_return) + np.float32(fixed_income_vol) * rng.standard_normal(shape, dtype=np.float32)
+    annual_return = equity_alloc[None, :] * eq_rets + (1 - equity_alloc[None, :]) * fi_rets
+    # A year can lose at most 99%, which keeps the growth factors positive
+    np.maximum(annual_return, -0.99, out=annual_return)
+
+    # Same closed-form recurrence as simulate, broadcast over all scenarios
+    cashflow = contribs - outflows
+    growth_factor = np.cumprod(1 + annual_return, axis=1)
+    balance = growth_factor * (np.float32(current_savings) + np.cumsum(cashflow[None, :] / growth_factor, axis=1))
+
+    bands = (np.quantile(balance, [0.1, 0.5, 0.9], axis=0) * PER_CRORE).astype(np.float32)
+    success_rate = float(np.mean(balance.min(axis=1) >= 0))
+    return pd.DataFrame({
+        "10th Percentile": bands[0],
+        "Median": bands[1],
+        "90th Percentile": bands[2]
+    }, index=pd.Index(ages, name="Age"), copy=False), success_rate
+
+# Cached entry points so reruns with unchanged inputs skip the recomputation;
+# arguments must be hashable (one-time expenses as a tuple of tuples)
+@st.cache_data(show_spinner=False)
+def cached_retirement_calculator(*args):
+    return retirement_calculator(*args)
+
+@st.cache_data(show_spinner=False)
+def cached_monte_carlo_simulation(*args):
+    return monte_carlo_simulation(*args)
+
+@st.cache_data(show_spinner=False)
+def glide_path_preview(strategy, custom_start, custom_end, custom_age):
+    preview_ages = np.arange(25, 91, dtype=np.int16)
+    start_pct, end_pct = glide_path_bounds(strategy, custom_start, custom_end)
+    preview_allocs = equity_alloc_vec(preview_ages, 27, custom_age, start_pct, end_pct) * 100.0
+    return pd.DataFrame({"Equity Allocation (%)": preview_allocs},
+                        index=pd.Index(preview_ages, name="Age"), copy=False)
 
 # Streamlit App
 st.title("\U0001F4CA Retirement Simulator with Glide Path")
@@ -127,10 +193,8 @@ if strategy == "Custom":
 else:
     custom_start, custom_end, custom_age = 0.85, 0.2, 60
 
-preview_ages = list(range(25, 91))
-preview_allocs = [get_equity_allocation(age, strategy, start_age=27, end_age=custom_age, start_pct=custom_start, end_pct=custom_end) * 100 for age in preview_ages]
-glide_df = pd.DataFrame({"Age": preview_ages, "Equity Allocation (%)": preview_allocs})
-st.line_chart(glide_df.set_index("Age"))
+glide_df = glide_path_preview(strategy, custom_start, custom_end, custom_age)
+st.line_chart(glide_df)
 
 
 st.markdown("### 💰 Contributions")
@@ -146,13 +210,16 @@ input_exp = st.text_area(
     "One-Time Expenses (in today’s value, one per line as age,amount)",
     "28,2000000\n35,30000000\n50,30000000"
 )
-one_time_expenses = []
-for line in input_exp.strip().split('\n'):
-    try:
-        age, amt = map(int, line.split(','))
-        one_time_expenses.append((age, amt))
-    except:
-        pass
+# Keep only lines of exactly two finite whole numbers; "_extra" flags too many fields
+try:
+    ote_df = pd.read_csv(io.StringIO(input_exp), header=None, names=["age", "amt", "_extra"],
+                         index_col=False, dtype=str, on_bad_lines="skip", quoting=csv.QUOTE_NONE)
+except pd.errors.EmptyDataError:
+    ote_df = pd.DataFrame(columns=["age", "amt", "_extra"], dtype=str)
+ote_df = ote_df.loc[ote_df["_extra"].isna(), ["age", "amt"]]
+ote_values = ote_df.apply(lambda col: pd.to_numeric(col.str.strip(), errors="coerce")).to_numpy(dtype=np.float64)
+valid = (np.isfinite(ote_values) & (ote_values == np.trunc(ote_values)) & (np.abs(ote_values) < 2.0**63)).all(axis=1)
+one_time_expenses = tuple((int(age), int(amt)) for age, amt in ote_values[valid])
 
 st.markdown("### 🏦 Home Loan")
 include_loan = st.checkbox("Include Home Loan")
@@ -165,43 +232,40 @@ if include_loan:
 else:
     home_loan = None
 
-if st.button("Simulate"):
-    df = retirement_calculator(
-        current_age, retirement_age, life_expectancy,
-        current_savings, monthly_contribution,
-        equity_return, fixed_income_return,
-        annual_ret_expenses, exp_inflation_rate,
-        annual_contrib_increase, one_time_expenses,
-        home_loan, strategy, custom_start, custom_end, custom_age
-    )
+st.markdown("### 🎲 Monte Carlo")
+run_monte_carlo = st.checkbox("Run Monte Carlo Scenarios", help="Draws random yearly returns around the expected returns above and shows the range of outcomes.")
+if run_monte_carlo:
+    n_scenarios = st.slider("Scenarios", 100, 10_000, 1_000, step=100)
+    equity_vol = st.slider("Equity Return Volatility", 0.0, 0.40, 0.18)
+    fixed_income_vol = st.slider("Fixed Income Return Volatility", 0.0, 0.10, 0.04)
+    monte_carlo = (n_scenarios, equity_vol, fixed_income_vol)
+else:
+    monte_carlo = None
+
+# Clicking Simulate reruns only this fragment, not the whole input section
+@st.fragment
+def simulation_section(sim_args, highlight_years, life_expectancy, monte_carlo=None):
+    if not st.button("Simulate"):
+        return
+
+    df = cached_retirement_calculator(*sim_args)
 
     st.subheader("Net Worth Over Time")
-    line_chart = alt.Chart(df).mark_line().encode(
-        x="Age",
-        y=alt.Y("Net Worth", title="Net Worth (Cr)"),
-        tooltip=["Age", "Net Worth"]
-    ).properties(width=700, height=300)
-    st.altair_chart(line_chart, use_container_width=True)
+    st.vega_lite_chart(df, LINE_SPEC, width="stretch")
 
     st.subheader("Breakdown: Contributions, Returns & Expenses")
-    area_chart = alt.Chart(df).transform_fold(
-        ["Contribution", "Return", "Expense"],
-        as_=["Type", "Amount"]
-    ).mark_area(opacity=0.6).encode(
-        x=alt.X("Age:Q", title="Age"),
-        y=alt.Y("Amount:Q", title="Amount (Cr)"),
-        color=alt.Color("Type:N", title="Flow Type"),
-        tooltip=[alt.Tooltip("Age:Q"), alt.Tooltip("Type:N"), alt.Tooltip("Amount:Q", format=".2f")]
-    ).properties(width=700, height=300)
-    st.altair_chart(area_chart, use_container_width=True)
+    st.vega_lite_chart(df, AREA_SPEC, width="stretch")
 
     st.subheader("Data Table")
-    highlight_years = set([current_age, retirement_age, life_expectancy] + [age for age, _ in one_time_expenses])
-    df_filtered = df[df["Age"].apply(lambda x: x in highlight_years or x % 5 == 0)].reset_index(drop=True)
-    st.dataframe(df_filtered.style.format({
-        "Net Worth (Cr)": "{:.2f}", "Contribution (Cr)": "{:.2f}",
-        "Expense (Cr)": "{:.2f}", "Return (Cr)": "{:.2f}", "Equity %": "{:.0f}"
-    }))
+    mask = df["Age"].isin(highlight_years) | (df["Age"].to_numpy() % 5 == 0)
+    df_filtered = df.loc[mask].reset_index(drop=True)
+    st.dataframe(df_filtered, column_config={
+        "Net Worth": st.column_config.NumberColumn("Net Worth (Cr)", format="%.2f"),
+        "Contribution": st.column_config.NumberColumn("Contribution (Cr)", format="%.2f"),
+        "Expense": st.column_config.NumberColumn("Expense (Cr)", format="%.2f"),
+        "Return": st.column_config.NumberColumn("Return (Cr)", format="%.2f"),
+        "Equity %": st.column_config.NumberColumn(format="%.0f")
+    })
 
     st.subheader("\U0001F4CA Summary")
     final_balance = df["Net Worth"].iloc[-1]
@@ -210,3 +274,21 @@ if st.button("Simulate"):
     st.info(f"📈 Peak Net Worth: ₹{peak_row['Net Worth']:.2f} Cr at age {int(peak_row['Age'])}")
     if (df["Net Worth"] < 0).any():
         st.error("⚠️ Warning: Your savings run out before life expectancy!")
+
+    if monte_carlo:
+        n_scenarios = monte_carlo[0]
+        st.subheader("🎲 Monte Carlo Range")
+        bands_df, success_rate = cached_monte_carlo_simulation(*sim_args, *monte_carlo)
+        st.line_chart(bands_df, y_label="Net Worth (Cr)")
+        st.info(f"🎯 Savings last until age {life_expectancy} in {success_rate:.0%} of {n_scenarios:,} scenarios")
+
+sim_args = (
+    current_age, retirement_age, life_expectancy,
+    current_savings, monthly_contribution,
+    equity_return, fixed_income_return,
+    annual_ret_expenses, exp_inflation_rate,
+    annual_contrib_increase, one_time_expenses,
+    home_loan, strategy, custom_start, custom_end, custom_age
+)
+highlight_years = {current_age, retirement_age, life_expectancy, *(age for age, _ in one_time_expenses)}
+simulation_section(sim_args, highlight_years, life_expectancy, monte_carlo)
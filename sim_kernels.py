@@ -0,0 +1,85 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the kernels run as plain NumPy without it
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+# Branchless glide path over an array of ages; the span is floored at one
+# year so an end age at or before the start age switches straight to end_pct
+@njit(cache=True)
+def equity_alloc_vec(ages, start_age, end_age, start_pct, end_pct):
+    span = max(end_age - start_age, 1)
+    t = np.clip((ages - start_age) / span, 0.0, 1.0).astype(np.float32)
+    return np.float32(start_pct) - t * np.float32(start_pct - end_pct)
+
+@njit(cache=True)
+def calculate_annual_emi(principal, annual_rate, years):
+    monthly_rate = annual_rate / 12
+    months = years * 12
+    # P*r / (1 - (1+r)^-n): one pow, and broadcasts over arrays of loans
+    emi = principal * monthly_rate / (1 - (1 + monthly_rate)**-months)
+    return emi * 12
+
+# Pure-numeric simulation kernels, compiled by numba when it is installed.
+# Work in float32 throughout: the inputs are slider-precision rates, and
+# constants are typed explicitly so numba does not promote to float64
+@njit(cache=True, fastmath=True)
+def cashflows(ages, current_age, retirement_age,
+              monthly_contribution, annual_ret_expenses, exp_inflation_rate,
+              annual_contrib_increase, start_pct, end_pct, glide_end_age,
+              exp_ages, exp_amounts,
+              emi_start_age, emi_principal, emi_years, emi_rate):
+    years = ages.shape[0]
+    one = np.float32(1.0)
+    zero = np.float32(0.0)
+    elapsed = (ages - current_age).astype(np.float32)
+    # Inflation factor for every simulated year, shared by all inflated amounts
+    infl_factor = (one + exp_inflation_rate) ** elapsed
+
+    # Per-year quantities without a cross-year dependency, computed as arrays
+    equity_alloc = equity_alloc_vec(ages, current_age, glide_end_age, start_pct, end_pct)
+
+    # Working years contribute, retirement years draw expenses; one compare for both
+    work_mask = ages < retirement_age
+    ret_mask = ~work_mask
+    contribs = np.where(work_mask,
+                       monthly_contribution * np.float32(12.0) * (one + annual_contrib_increase) ** elapsed, zero)
+    outflows = np.where(ret_mask, annual_ret_expenses * infl_factor, zero)
+
+    # One-time expenses, scattered by year offset (ages outside the horizon are ignored)
+    lump_by_age = np.zeros(years, dtype=np.float32)
+    for j in range(exp_ages.shape[0]):
+        offset = exp_ages[j] - current_age
+        if 0 <= offset < years:
+            lump_by_age[offset] += exp_amounts[j]
+    outflows += lump_by_age * infl_factor
+
+    # Home loan EMI: fixed for the whole loan, so computed once from the
+    # principal inflated to the start year (emi_years == 0 means no loan)
+    emi_offset = emi_start_age - current_age
+    if emi_years > 0 and 0 <= emi_offset < years:
+        effective_principal = emi_principal * infl_factor[emi_offset]
+        emi_amount = np.float32(calculate_annual_emi(effective_principal, emi_rate, emi_years))
+        emi_mask = (ages >= emi_start_age) & (ages < emi_start_age + emi_years)
+        outflows += np.where(emi_mask, emi_amount, zero)
+
+    return equity_alloc, contribs, outflows
+
+@njit(cache=True, fastmath=True)
+def simulate(equity_alloc, contribs, outflows,
+             current_savings, equity_return, fixed_income_return):
+    one = np.float32(1.0)
+    annual_return = equity_alloc * equity_return + (one - equity_alloc) * fixed_income_return
+
+    # balance_t = balance_{t-1} * (1 + r_t) + cashflow_t, solved in closed form
+    cashflow = contribs - outflows
+    growth_factor = np.cumprod(one + annual_return)
+    balance = growth_factor * (current_savings + np.cumsum(cashflow / growth_factor))
+    prev_balance = np.empty_like(balance)
+    prev_balance[0] = current_savings
+    prev_balance[1:] = balance[:-1]
+    growth = prev_balance * annual_return
+
+    return balance, growth